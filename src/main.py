@@ -22,22 +22,73 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import os
+import threading
 import cv2 as cv
 import mediapipe as mp
 import numpy as np
 from typing import Tuple, Text
 from dataclasses import dataclass
 
+LABEL_FONT = cv.FONT_HERSHEY_SIMPLEX
+LABEL_FONT_SCALE = 0.5
+LABEL_FONT_THICKNESS = 2
+
+DEBUG = False  # Print the mouse cursor position every frame, handy when laying out the UI
+
+# Run the flip/resize/color conversion through OpenCL (cv.UMat), only worth it with an otherwise idle iGPU
+USE_OPENCL = False
+
+# Number of index finger positions collected before the stroke is drawn on the canvas with a single call
+STROKE_BATCH = 8
+
+# Starting width of the window, it holds the webcam and the canvas side by side and can be resized freely
+WINDOW_WIDTH = 1280
+
+# Hand detection runs on a downscaled copy of the frame, landmarks are normalized so they still map onto the full frame
+DETECTION_WIDTH = 320
+
+
+def layout_box_labels(boxes) -> None:
+	"""Pre-compute the centered label position and color of each box, so it isn't done every frame"""
+	for box in boxes:
+		x1, y1, x2, y2 = box["pos"]
+		text_size = cv.getTextSize(box["name"], LABEL_FONT, LABEL_FONT_SCALE, LABEL_FONT_THICKNESS)[0]
+		text_x = x1 + (x2 - x1 - text_size[0]) // 2  # Center text horizontally
+		text_y = y1 + (y2 - y1 + text_size[1]) // 2  # Center text vertically
+		box["text_pos"] = (text_x, text_y)
+		box["text_color"] = (255, 255, 255) if box["color"] != ColorPalette.WHITE else (0, 0, 0)  # Black text on white box
+
+
+NO_BOX = 255
+
+
+def build_hit_map(boxes) -> np.ndarray:
+	"""Map every pixel of the toolbar to the index of the box covering it, NO_BOX where there is none"""
+	hit_map = np.full((max(box["pos"][3] for box in boxes) + 1, max(box["pos"][2] for box in boxes) + 1), NO_BOX, np.uint8)
+	for index, box in enumerate(boxes):
+		x1, y1, x2, y2 = box["pos"]
+		hit_map[y1:y2 + 1, x1:x2 + 1] = index
+	return hit_map
+
+
+def box_at(x: int, y: int) -> int:
+	"""Return the index in TOOLBAR_BOXES of the box at the given coordinates, NO_BOX if there is none"""
+	if 0 <= y < TOOLBAR_HIT_MAP.shape[0] and 0 <= x < TOOLBAR_HIT_MAP.shape[1]:
+		return int(TOOLBAR_HIT_MAP[y, x])
+	return NO_BOX
+
 
 @dataclass
 class DrawingState:
 	"""Maintains the state of drawing parameters"""
-	canvas: np.ndarray
+	ink: np.ndarray  # Palette index of every canvas pixel, 0 is the white background
+	canvas: np.ndarray  # BGR image of the ink, only rebuilt when it's shown
 	color: Tuple[int, int, int]
 	thickness: int
-	index_prev_x: int | None
-	index_prev_y: int | None
+	stroke_points: list[Tuple[int, int]]
 	sensitivity: int
+	canvas_dirty: bool  # Set whenever the canvas changes, so it's only copied to the window again when needed
 
 
 class ColorPalette:
@@ -48,6 +99,11 @@ class ColorPalette:
 	GREEN = (0, 255, 0)
 	BLUE = (255, 0, 0)
 	
+	# The canvas is drawn as palette indices and turned into colors only for display, white comes first as background
+	PALETTE_COLORS = (WHITE, BLACK, RED, GREEN, BLUE)
+	PALETTE = np.array(PALETTE_COLORS, np.uint8)
+	PALETTE_INDEX = {color: index for index, color in enumerate(PALETTE_COLORS)}
+
 	COLOR_BOXES = [
 		{"color": RED, "pos": (350, 2, 400, 52), "name": "Red"},
 		{"color": GREEN, "pos": (410, 2, 460, 52), "name": "Green"},
@@ -55,82 +111,57 @@ class ColorPalette:
 		{"color": BLACK, "pos": (530, 2, 580, 52), "name": "Black"},
 		{"color": WHITE, "pos": (590, 2, 640, 52), "name": "White"}
 	]
+	COLOR_LUT = tuple(box["color"] for box in COLOR_BOXES)
 	
 	@staticmethod
 	def draw_color_boxes(frame: np.ndarray) -> None:
 		"""Draw color selection boxes on the frame"""
 		for box in ColorPalette.COLOR_BOXES:
 			x1, y1, x2, y2 = box["pos"]
-			color = box["color"]
-			cv.rectangle(frame, (x1, y1), (x2, y2), color, -1)
-			
-			name = box["name"]
-			
-			font = cv.FONT_HERSHEY_SIMPLEX
-			font_scale = 0.5
-			font_thickness = 2
-			text_color = (255, 255, 255) if color != ColorPalette.WHITE else (0, 0, 0)  # Make text black on white box
-			
-			# Calculate text size and position
-			text_size = cv.getTextSize(name, font, font_scale, font_thickness)[0]
-			text_x = x1 + (x2 - x1 - text_size[0]) // 2  # Center text horizontally
-			text_y = y1 + (y2 - y1 + text_size[1]) // 2  # Center text vertically
-			
-			# Put the text in the box
-			cv.putText(frame, name, (text_x, text_y), font, font_scale, text_color, font_thickness)
-	
+			cv.rectangle(frame, (x1, y1), (x2, y2), box["color"], -1)
+			cv.putText(frame, box["name"], box["text_pos"], LABEL_FONT, LABEL_FONT_SCALE, box["text_color"],
+								 LABEL_FONT_THICKNESS)
+
 	@staticmethod
 	def get_selected_color(x: int, y: int) -> Tuple[int, int, int] | None:
 		"""Determine if a color is selected based on coordinates"""
-		for box in ColorPalette.COLOR_BOXES:
-			x1, y1, x2, y2 = box["pos"]
-			if x <= x2 and y1 <= y <= y2:
-				return box["color"]
+		index = box_at(x, y)  # Color boxes come first in TOOLBAR_BOXES
+		if index < len(ColorPalette.COLOR_LUT):
+			return ColorPalette.COLOR_LUT[index]
 		return None
 
 
+layout_box_labels(ColorPalette.COLOR_BOXES)
+
+
 class DrawingTools:
 	TOOLS = [
 		{"name": "Clear", "pos": (720, 2, 770, 52), "color": ColorPalette.WHITE},
 		{"name": "+", "pos": (780, 2, 830, 52), "color": ColorPalette.WHITE},
 		{"name": "-", "pos": (840, 2, 890, 52), "color": ColorPalette.WHITE}
 	]
+	TOOL_LUT = tuple(box["name"] for box in TOOLS)
 	
 	@staticmethod
 	def draw_tool_boxes(frame: np.ndarray) -> None:
 		"""Draw tools boxes on the frame"""
 		for box in DrawingTools.TOOLS:
 			x1, y1, x2, y2 = box["pos"]
-			color = box["color"]
-			cv.rectangle(frame, (x1, y1), (x2, y2), color, -1)
-			
-			name = box["name"]
-			
-			font = cv.FONT_HERSHEY_SIMPLEX
-			font_scale = 0.5
-			font_thickness = 2
-			text_color = (255, 255, 255) if color != ColorPalette.WHITE else (0, 0, 0)
-			
-			# Calculate text size and position
-			text_size = cv.getTextSize(name, font, font_scale, font_thickness)[0]
-			text_x = x1 + (x2 - x1 - text_size[0]) // 2  # Center text horizontally
-			text_y = y1 + (y2 - y1 + text_size[1]) // 2  # Center text vertically
-			
-			# Put the text in the box
-			cv.putText(frame, name, (text_x, text_y), font, font_scale, text_color, font_thickness)
-	
+			cv.rectangle(frame, (x1, y1), (x2, y2), box["color"], -1)
+			cv.putText(frame, box["name"], box["text_pos"], LABEL_FONT, LABEL_FONT_SCALE, box["text_color"],
+								 LABEL_FONT_THICKNESS)
+
 	@staticmethod
 	def get_selected_tool(x: int, y: int) -> Text | None:
-		"""Determine if a color is selected based on coordinates"""
-		for box in DrawingTools.TOOLS:
-			x1, y1, x2, y2 = box["pos"]
-			if x <= x2 and y1 <= y <= y2:
-				return box["name"]
+		"""Determine if a tool is selected based on coordinates"""
+		index = box_at(x, y) - len(ColorPalette.COLOR_BOXES)
+		if 0 <= index < len(DrawingTools.TOOL_LUT):
+			return DrawingTools.TOOL_LUT[index]
 		return None
 	
 	@staticmethod
-	def clear(canvas: np.ndarray):
-		canvas[:, :] = 255
+	def clear(ink: np.ndarray):
+		ink.fill(0)
 	
 	@staticmethod
 	def increase_thickness(thickness):
@@ -143,6 +174,12 @@ class DrawingTools:
 		return max(1, thickness - 1)
 
 
+layout_box_labels(DrawingTools.TOOLS)
+
+TOOLBAR_BOXES = ColorPalette.COLOR_BOXES + DrawingTools.TOOLS
+TOOLBAR_HIT_MAP = build_hit_map(TOOLBAR_BOXES)
+
+
 @dataclass
 class Camera:
 	"""Maintains the information about the camera"""
@@ -157,32 +194,175 @@ class Cursor:
 	pos_y: int
 
 
+class FreshestFrame(threading.Thread):
+	"""Wraps a VideoCapture, grabbing frames on a background thread so read() always returns the newest one"""
+	
+	def __init__(self, cap: cv.VideoCapture):
+		super().__init__(daemon=True)
+		self.cap = cap
+		self.cond = threading.Condition()
+		self.running = True
+		self.frame: np.ndarray | None = None
+		self.latest_seq = 0
+		self.last_seq = 0
+		self.start()
+
+	def run(self):
+		"""Keep grabbing frames so the driver's buffer never goes stale, every frame is retrieved as soon as it's grabbed.
+		Retrieving only on demand would make read() wait for the next exposure, since this thread is almost always
+		blocked inside grab()"""
+		while self.running and self.cap.grab():
+			success, frame = self.cap.retrieve()
+			if not success:
+				break
+			with self.cond:
+				self.frame = frame
+				self.latest_seq += 1
+				self.cond.notify_all()
+
+		with self.cond:
+			self.running = False
+			self.cond.notify_all()
+
+	def isOpened(self) -> bool:
+		"""Mirror VideoCapture.isOpened, False once the camera stops delivering frames"""
+		return self.running
+
+	def read(self) -> Tuple[bool, np.ndarray | None]:
+		"""Return the newest frame, only waiting when it was already returned by the previous read"""
+		with self.cond:
+			self.cond.wait_for(lambda: self.latest_seq > self.last_seq or not self.running)
+			if self.latest_seq == self.last_seq:
+				return False, None
+			self.last_seq = self.latest_seq
+			return True, self.frame
+
+	def release(self):
+		"""Stop the grabbing thread and release the camera"""
+		with self.cond:
+			self.running = False
+			self.cond.notify_all()
+		self.join()
+		self.cap.release()
+
+
 class HandDetector:
 	"""Handles hand detection and finger tracking"""
 	
+	# Plain integer landmark indices, resolved from the HandLandmark enum once instead of every frame
+	IDX_INDEX_TIP = int(mp.solutions.hands.HandLandmark.INDEX_FINGER_TIP)
+	IDX_INDEX_DIP = int(mp.solutions.hands.HandLandmark.INDEX_FINGER_DIP)
+	IDX_INDEX_PIP = int(mp.solutions.hands.HandLandmark.INDEX_FINGER_PIP)
+	IDX_PINKY_TIP = int(mp.solutions.hands.HandLandmark.PINKY_TIP)
+	IDX_PINKY_DIP = int(mp.solutions.hands.HandLandmark.PINKY_DIP)
+	IDX_PINKY_PIP = int(mp.solutions.hands.HandLandmark.PINKY_PIP)
+
+	# Landmark indices of the fingers checked every frame, in the order returned by fingers_up
+	FINGER_TIPS = np.array([IDX_INDEX_TIP, IDX_PINKY_TIP], np.intp)
+	FINGER_DIPS = np.array([IDX_INDEX_DIP, IDX_PINKY_DIP], np.intp)
+	FINGER_PIPS = np.array([IDX_INDEX_PIP, IDX_PINKY_PIP], np.intp)
+	CONNECTIONS = np.array(sorted(mp.solutions.hands.HAND_CONNECTIONS), np.int32)  # (E, 2) landmark index pairs
+
 	def __init__(self):
 		self.mp_hands = mp.solutions.hands
 		self.hands = self.mp_hands.Hands(
 			static_image_mode=False,
 			max_num_hands=1,
+			model_complexity=0,  # Lite model, much faster on CPU
 			min_detection_confidence=0.5
 		)
-		self.mp_drawing = mp.solutions.drawing_utils
-	
-	def is_finger_up(self, landmarks, finger_tip, finger_dip, finger_pip) -> bool:
-		"""Check if a finger is pointing upward"""
-		if finger_pip == self.mp_hands.HandLandmark.THUMB_IP:
-			return False
-		return (landmarks[finger_tip].y < landmarks[finger_pip].y and
-						landmarks[finger_tip].y < landmarks[finger_dip].y)
+
+		# Detection runs on its own thread, the app renders with the latest result while the next one is in flight
+		self.latest_result = None
+		self.result_seq = 0  # Incremented with every new result, so callers can tell it apart from the previous one
+		self.pending_frame: np.ndarray | None = None
+		self.free_buffers: list[np.ndarray] = []  # RGB buffers neither pending nor being detected, reused by acquire_buffer
+		self.frame_pending = threading.Condition()
+		self.running = True
+		self.detection_thread = threading.Thread(target=self.detect_frames, daemon=True)
+		self.detection_thread.start()
+
+	def acquire_buffer(self, shape: Tuple[int, int, int]) -> np.ndarray:
+		"""Return a buffer to write the next RGB frame into, at most three are in use (written, pending, detected)"""
+		with self.frame_pending:
+			while self.free_buffers:
+				buffer = self.free_buffers.pop()
+				if buffer.shape == shape:
+					return buffer
+		return np.empty(shape, np.uint8)
+
+	def release_buffer(self, buffer: np.ndarray) -> None:
+		"""Give a buffer back to be reused, must be called with frame_pending held"""
+		if len(self.free_buffers) < 3:  # Bounds the pool when frames come from elsewhere, like the OpenCL path
+			self.free_buffers.append(buffer)
+
+	def detect_async(self, rgb_frame: np.ndarray) -> None:
+		"""Queue a frame for detection without waiting for it, replacing any frame not yet picked up"""
+		with self.frame_pending:
+			if self.pending_frame is not None:
+				self.release_buffer(self.pending_frame)
+			self.pending_frame = rgb_frame  # Owned by the detector until it's released again
+			self.frame_pending.notify()
+
+	def detect_frames(self):
+		"""Run hand detection on the queued frames, keeping the result of the most recent one"""
+		while True:
+			with self.frame_pending:
+				self.frame_pending.wait_for(lambda: self.pending_frame is not None or not self.running)
+				if not self.running:
+					break
+				rgb_frame, self.pending_frame = self.pending_frame, None
+			result = self.hands.process(rgb_frame)
+			with self.frame_pending:
+				self.release_buffer(rgb_frame)
+				self.latest_result = result
+				self.result_seq += 1
+
+	def get_latest_result(self):
+		"""Return the sequence number and the most recent detection result"""
+		with self.frame_pending:
+			return self.result_seq, self.latest_result
+
+	def close(self):
+		"""Stop the detection thread and release the model"""
+		with self.frame_pending:
+			self.running = False
+			self.frame_pending.notify()
+		self.detection_thread.join()
+		self.hands.close()
 	
 	@staticmethod
-	def calculate_coordinates(finger_tip, frame) -> Tuple[int, int]:
-		"""Calculate x,y coordinates for a fingertip"""
+	def landmarks_to_array(landmarks) -> np.ndarray:
+		"""Convert the 21 hand landmarks to a (21, 3) array of x,y,z coordinates"""
+		return np.fromiter(
+			(coord for landmark in landmarks for coord in (landmark.x, landmark.y, landmark.z)),
+			np.float32,
+			len(landmarks) * 3
+		).reshape(-1, 3)
+
+	@staticmethod
+	def draw_landmarks(frame: np.ndarray, points: np.ndarray) -> None:
+		"""Draw the hand skeleton, all the connections with a single polylines call"""
 		frame_h, frame_w, _ = frame.shape
-		x = int(finger_tip.x * frame_w)
-		y = int(finger_tip.y * frame_h)
-		return x, y
+		pixels = (points[:, :2] * (frame_w, frame_h)).astype(np.int32)
+		cv.polylines(frame, list(pixels[HandDetector.CONNECTIONS]), False, (224, 224, 224), 2)
+		for x, y in pixels:
+			# Same look as mp.solutions.drawing_utils: a light ring (radius max(r + 1, int(r * 1.2))) under a red dot
+			cv.circle(frame, (int(x), int(y)), 3, (224, 224, 224), 2)
+			cv.circle(frame, (int(x), int(y)), 2, ColorPalette.RED, 2)
+
+	@staticmethod
+	def fingers_up(points: np.ndarray) -> np.ndarray:
+		"""Check which of the index and pinky fingers are pointing upward"""
+		tips_y = points[HandDetector.FINGER_TIPS, 1]
+		return (tips_y < points[HandDetector.FINGER_PIPS, 1]) & (tips_y < points[HandDetector.FINGER_DIPS, 1])
+	
+	@staticmethod
+	def analyze_hand(points: np.ndarray, frame_w: int, frame_h: int) -> Tuple[bool, bool, Tuple[int, int], Tuple[int, int]]:
+		"""Check if the index and pinky fingers are up and calculate the x,y coordinates of their tips"""
+		is_index_up, is_pinky_up = HandDetector.fingers_up(points)
+		index_tip, pinky_tip = (points[HandDetector.FINGER_TIPS, :2] * (frame_w, frame_h)).astype(int).tolist()
+		return bool(is_index_up), bool(is_pinky_up), tuple(index_tip), tuple(pinky_tip)
 
 
 class HandDrawingApp:
@@ -191,21 +371,30 @@ class HandDrawingApp:
 	def __init__(self):
 		self.detector = HandDetector()
 		self.state = DrawingState(
-			canvas=np.ones((450, 800, 3), np.uint8) * 255,
+			ink=np.zeros((450, 800), np.uint8),
+			canvas=np.full((450, 800, 3), 255, np.uint8),
 			color=ColorPalette.BLACK,
 			thickness=4,
-			index_prev_x=None,
-			index_prev_y=None,
-			sensitivity=20
-		
+			stroke_points=[],
+			sensitivity=20,
+			canvas_dirty=True
 		)
 		self.camera = Camera(
-			window_name='Webcam',
+			window_name='WhiteboardAI',
 			width=1000,
 			height=700
 		)
 		self.setup_camera()
-		
+		self.setup_toolbar()
+
+		# Reused every frame, (re)allocated on the first frame or when the camera resolution changes
+		self.flip_buffer: np.ndarray | None = None
+		self.small_buffer: np.ndarray | None = None
+		self.composite: np.ndarray | None = None  # Webcam and canvas side by side, shown in a single window
+		self.use_opencl = USE_OPENCL and cv.ocl.haveOpenCL()
+		self.handled_seq = 0  # Sequence number of the last detection result that updated the drawing state
+		self.show_landmarks = True  # Turning the hand skeleton off saves some drawing every frame
+
 		self.cursor = Cursor(
 			pos_x=0,
 			pos_y=0
@@ -214,13 +403,42 @@ class HandDrawingApp:
 	
 	def setup_camera(self):
 		"""Initialize the camera with desired settings"""
-		self.cam = cv.VideoCapture(0)
-		self.cam.set(cv.CAP_PROP_FRAME_WIDTH, self.camera.width)
-		self.cam.set(cv.CAP_PROP_FRAME_HEIGHT, self.camera.height)
-	
+		cap = cv.VideoCapture(0)
+		cap.set(cv.CAP_PROP_FRAME_WIDTH, self.camera.width)
+		cap.set(cv.CAP_PROP_FRAME_HEIGHT, self.camera.height)
+		self.cam = FreshestFrame(cap)
+
+	def setup_toolbar(self):
+		"""Render the static color and tool boxes once, so each frame only needs a masked copy"""
+		x1 = min(box["pos"][0] for box in TOOLBAR_BOXES)
+		y1 = min(box["pos"][1] for box in TOOLBAR_BOXES)
+
+		sheet = np.zeros((*TOOLBAR_HIT_MAP.shape, 3), np.uint8)
+		ColorPalette.draw_color_boxes(sheet)
+		DrawingTools.draw_tool_boxes(sheet)
+
+		# Only the boxes are copied, the gaps between them keep showing the webcam
+		mask = (TOOLBAR_HIT_MAP != NO_BOX)[..., np.newaxis]
+
+		self.toolbar_origin = (x1, y1)
+		self.toolbar = sheet[y1:, x1:]
+		self.toolbar_mask = mask[y1:, x1:]
+
+	def draw_toolbar(self, frame: np.ndarray) -> None:
+		"""Copy the pre-rendered toolbar onto the frame, clipped to the frame size"""
+		x1, y1 = self.toolbar_origin
+		region = frame[y1:y1 + self.toolbar.shape[0], x1:x1 + self.toolbar.shape[1]]
+		h, w = region.shape[:2]
+		np.copyto(region, self.toolbar[:h, :w], where=self.toolbar_mask[:h, :w])
+
 	def setup_mouse_callback(self):
 		"""Initialize mouse callback for tracking cursor position"""
-		cv.namedWindow(self.camera.window_name)  # Make sure the window is named
+		# Resizable, since the webcam and the canvas side by side are wider than many screens
+		cv.namedWindow(self.camera.window_name, cv.WINDOW_NORMAL | cv.WINDOW_KEEPRATIO)
+		canvas_h, canvas_w, _ = self.state.canvas.shape
+		composite_w = self.camera.width + canvas_w
+		composite_h = max(self.camera.height, canvas_h)
+		cv.resizeWindow(self.camera.window_name, WINDOW_WIDTH, WINDOW_WIDTH * composite_h // composite_w)
 		cv.setMouseCallback(self.camera.window_name, self.mouse_callback)
 	
 	def mouse_callback(self, event, x, y, flags, param):
@@ -228,81 +446,103 @@ class HandDrawingApp:
 		if event == cv.EVENT_MOUSEMOVE:
 			self.cursor.pos_x, self.cursor.pos_y = x, y
 	
+	def prepare_frame(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+		"""Return the mirrored frame for display and its downscaled RGB copy for hand detection"""
+		if self.use_opencl:
+			umat = cv.flip(cv.UMat(frame), 1)
+			frame_h, frame_w = frame.shape[:2]
+			small_size = (DETECTION_WIDTH, max(1, frame_h * DETECTION_WIDTH // frame_w))
+			rgb_umat = cv.cvtColor(cv.resize(umat, small_size, interpolation=cv.INTER_LINEAR), cv.COLOR_BGR2RGB)
+			return umat.get(), rgb_umat.get()  # MediaPipe and the drawing code need numpy arrays
+
+		if self.flip_buffer is None or self.flip_buffer.shape != frame.shape:
+			frame_h, frame_w, channels = frame.shape
+			small_shape = (max(1, frame_h * DETECTION_WIDTH // frame_w), DETECTION_WIDTH, channels)  # Keep aspect ratio
+			self.flip_buffer = np.empty_like(frame)
+			self.small_buffer = np.empty(small_shape, np.uint8)
+
+		frame = cv.flip(frame, 1, dst=self.flip_buffer)  # 1 --> flips horizontally
+		small_frame = cv.resize(frame, self.small_buffer.shape[1::-1], dst=self.small_buffer,
+														interpolation=cv.INTER_LINEAR)
+		rgb_buffer = self.detector.acquire_buffer(self.small_buffer.shape)  # Handed over to the detector afterward
+		rgb_frame = cv.cvtColor(small_frame, cv.COLOR_BGR2RGB, dst=rgb_buffer)
+		return frame, rgb_frame
+
 	def process_frame(self, frame: np.ndarray):
 		"""Process each frame for hand detection and drawing"""
-		frame = cv.flip(frame, 1)  # 1 --> flips horizontally
-		rgb_frame = cv.cvtColor(frame, cv.COLOR_BGR2RGB)
-		ColorPalette.draw_color_boxes(frame)
-		DrawingTools.draw_tool_boxes(frame)
-		
-		result = self.detector.hands.process(rgb_frame)
-		
-		if result.multi_hand_landmarks:
-			self.process_hand_landmarks(frame, result)
+		frame, rgb_frame = self.prepare_frame(frame)
+		self.draw_toolbar(frame)
+
+		self.detector.detect_async(rgb_frame)
+		result_seq, result = self.detector.get_latest_result()
+		is_new = result_seq != self.handled_seq
+		self.handled_seq = result_seq
+
+		if result is not None and result.multi_hand_landmarks:
+			self.process_hand_landmarks(frame, result, is_new)
+		else:
+			# The hand left the frame, finish the stroke like when the index finger goes down
+			self.flush_stroke()
+			self.state.stroke_points.clear()
 		
-		print(f"Cursor -> x: {self.cursor.pos_x} | y: {self.cursor.pos_y}")
+		if DEBUG:
+			print(f"Cursor -> x: {self.cursor.pos_x} | y: {self.cursor.pos_y}")
 		cv.putText(frame, f"Thickness: {self.state.thickness}", (2, 35), cv.FONT_HERSHEY_SIMPLEX, 0.85, ColorPalette.WHITE,
 							 2)
 		return frame
 	
-	def process_hand_landmarks(self, frame, result):
-		"""Process detected hand landmarks for drawing"""
+	def process_hand_landmarks(self, frame, result, is_new):
+		"""Process detected hand landmarks for drawing, the drawing state only changes when the result is new"""
 		for hand_landmarks, handedness in zip(result.multi_hand_landmarks,
 																					result.multi_handedness):
-			self.detector.mp_drawing.draw_landmarks(
-				frame, hand_landmarks,
-				self.detector.mp_hands.HAND_CONNECTIONS
-			)
-			
-			landmarks = hand_landmarks.landmark
-			self.handle_drawing(frame, landmarks)
+			points = self.detector.landmarks_to_array(hand_landmarks.landmark)
+			if self.show_landmarks:
+				self.detector.draw_landmarks(frame, points)
+
+			self.handle_drawing(frame, points, is_new)
 	
-	def handle_drawing(self, frame, landmarks):
+	def handle_drawing(self, frame, points, is_new):
 		"""Handle the drawing logic based on finger positions"""
-		is_index_up = self.detector.is_finger_up(
-			landmarks,
-			self.detector.mp_hands.HandLandmark.INDEX_FINGER_TIP,
-			self.detector.mp_hands.HandLandmark.INDEX_FINGER_DIP,
-			self.detector.mp_hands.HandLandmark.INDEX_FINGER_PIP
-		)
-		
-		is_pinky_up = self.detector.is_finger_up(
-			landmarks,
-			self.detector.mp_hands.HandLandmark.PINKY_TIP,
-			self.detector.mp_hands.HandLandmark.PINKY_DIP,
-			self.detector.mp_hands.HandLandmark.PINKY_PIP
-		)
-		
-		self.handle_index_drawing(frame, landmarks, is_index_up)
-		self.handle_color_selection(frame, landmarks, is_pinky_up)
+		frame_h, frame_w, _ = frame.shape
+		is_index_up, is_pinky_up, index_tip, pinky_tip = self.detector.analyze_hand(points, frame_w, frame_h)
+
+		self.handle_index_drawing(frame, index_tip, is_index_up, is_new)
+		self.handle_color_selection(frame, pinky_tip, is_pinky_up, is_new)
 	
-	def handle_index_drawing(self, frame, landmarks, is_index_up):
+	def handle_index_drawing(self, frame, index_tip, is_index_up, is_new):
 		"""Handle drawing with index finger"""
 		if is_index_up:
-			index_tip = landmarks[self.detector.mp_hands.HandLandmark.INDEX_FINGER_TIP]
-			x, y = self.detector.calculate_coordinates(index_tip, frame)
+			x, y = index_tip
 			cv.circle(frame, (x, y), 15, self.state.color, -1)
+			if not is_new:
+				return  # The same result is shown again until the next one arrives, it was already added to the stroke
 			
 			x += self.state.sensitivity
 			y += self.state.sensitivity
-			if self.state.index_prev_x is not None:
-				cv.line(
-					self.state.canvas,
-					(self.state.index_prev_x, self.state.index_prev_y),
-					(x, y),
-					self.state.color,
-					self.state.thickness
-				)
-			self.state.index_prev_x, self.state.index_prev_y = x, y
+			self.state.stroke_points.append((x, y))
+			if len(self.state.stroke_points) >= STROKE_BATCH:
+				self.flush_stroke()
 		else:
-			self.state.index_prev_x = self.state.index_prev_y = None
+			self.flush_stroke()
+			self.state.stroke_points.clear()
+
+	def flush_stroke(self):
+		"""Draw the buffered stroke points on the canvas, keeping the last one so the stroke continues from there"""
+		if len(self.state.stroke_points) > 1:
+			points = np.array(self.state.stroke_points, np.int32).reshape(-1, 1, 2)
+			ink = ColorPalette.PALETTE_INDEX[self.state.color]
+			cv.polylines(self.state.ink, [points], False, ink, self.state.thickness)
+			self.state.canvas_dirty = True
+			del self.state.stroke_points[:-1]
 	
-	def handle_color_selection(self, frame, landmarks, is_pinky_up):
+	def handle_color_selection(self, frame, pinky_tip, is_pinky_up, is_new):
 		"""Handle color selection with pinky finger"""
 		if is_pinky_up:
-			pinky_tip = landmarks[self.detector.mp_hands.HandLandmark.PINKY_TIP]
-			x, y = self.detector.calculate_coordinates(pinky_tip, frame)
+			self.flush_stroke()  # The pending points belong to the current color and thickness
+			x, y = pinky_tip
 			cv.circle(frame, (x, y), 15, self.state.color, -1)
+			if not is_new:
+				return  # Select once per detection, not on every frame showing the same result
 			
 			new_color = ColorPalette.get_selected_color(x, y)
 			if new_color:
@@ -310,7 +550,8 @@ class HandDrawingApp:
 			else:
 				new_tool = DrawingTools.get_selected_tool(x, y)
 				if new_tool == 'Clear':
-					DrawingTools.clear(self.state.canvas)
+					DrawingTools.clear(self.state.ink)
+					self.state.canvas_dirty = True
 				
 				if new_tool == '+':
 					self.state.thickness = DrawingTools.increase_thickness(self.state.thickness)
@@ -327,21 +568,41 @@ class HandDrawingApp:
 			
 			processed_frame = self.process_frame(frame)
 			
-			cv.imshow(self.camera.window_name, processed_frame)
-			cv.imshow('Canvas', self.state.canvas)
+			cv.imshow(self.camera.window_name, self.compose_window(processed_frame))
 			
 			if cv.waitKey(1) == 27:  # ESC key
 				break
 		
 		self.cleanup()
 	
+	def compose_window(self, frame: np.ndarray) -> np.ndarray:
+		"""Place the webcam frame and the canvas side by side, so a single imshow updates both"""
+		frame_h, frame_w, _ = frame.shape
+		canvas_h, canvas_w, _ = self.state.canvas.shape
+		shape = (max(frame_h, canvas_h), frame_w + canvas_w, 3)
+		if self.composite is None or self.composite.shape != shape:
+			self.composite = np.zeros(shape, np.uint8)
+			self.state.canvas_dirty = True  # The new buffer doesn't hold the canvas yet
+
+		self.composite[:frame_h, :frame_w] = frame
+		if self.state.canvas_dirty:
+			np.take(ColorPalette.PALETTE, self.state.ink, axis=0, out=self.state.canvas)
+			self.composite[:canvas_h, frame_w:] = self.state.canvas
+			self.state.canvas_dirty = False
+		return self.composite
+
 	def cleanup(self):
 		"""Clean up resources"""
+		self.detector.close()
 		self.cam.release()
 		cv.destroyAllWindows()
 
 
 def main():
+	# Keep OpenCV on the optimized (SIMD/IPP) code paths and leave half of the cores to MediaPipe's inference threads
+	cv.setUseOptimized(True)
+	cv.setNumThreads(max(1, (os.cpu_count() or 2) // 2))
+
 	app = HandDrawingApp()
 	app.run()
 